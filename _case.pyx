@@ -0,0 +1,108 @@
+# cython: language_level=3
+"""
+Compiled versions of the case-matching helpers in html_filename_change.
+
+html_filename_change imports these when the extension has been built
+(python setup.py build_ext --inplace) and keeps its pure-Python versions
+otherwise. Behaviour must stay identical to those.
+"""
+import functools
+import os
+
+
+# Listings shared by the parent process; mutated in place, never rebound
+_shared_case_maps = {}
+
+
+def _list_dir(str dirpath):
+    """
+    List a directory and map casefolded entry names to actual names.
+
+    Args:
+        dirpath (str): Directory to list
+
+    Returns:
+        Dict[str, str]: Casefolded name -> actual name, empty if unreadable
+    """
+    cdef dict names = {}
+    try:
+        with os.scandir(dirpath) as entries:
+            for entry in entries:
+                names[entry.name.casefold()] = entry.name
+    except OSError:
+        return {}
+    return names
+
+
+@functools.lru_cache(maxsize=4096)
+def _case_map(str dirpath):
+    """
+    List a directory once, preferring the listing shared by the parent.
+
+    Args:
+        dirpath (str): Directory to list
+
+    Returns:
+        Dict[str, str]: Casefolded name -> actual name, empty if unreadable
+    """
+    names = _shared_case_maps.get(dirpath)
+    if names is None:
+        names = _list_dir(dirpath)
+    return names
+
+
+def _lookup(str dirpath, str name):
+    """
+    Find the actual name of a directory entry, ignoring case.
+
+    Args:
+        dirpath (str): Directory to look in
+        name (str): Entry name (may have incorrect case)
+
+    Returns:
+        Optional[str]: Actual entry name, or None if not found
+    """
+    cdef dict names = _case_map(dirpath)
+    return names.get(name.casefold())
+
+
+def get_actual_path(str path_str):
+    """
+    Find the actual case-sensitive path for a given path.
+
+    Args:
+        path_str (str): Path to check (may have incorrect case)
+
+    Returns:
+        Optional[str]: Actual path with correct case, or None if not found
+    """
+    cdef str sep = os.sep
+    cdef str drive, rest, current, part
+    cdef list parts
+
+    if os.altsep:
+        path_str = path_str.replace(os.altsep, sep)
+    drive, rest = os.path.splitdrive(path_str)
+    parts = rest.split(sep)
+
+    # Start from the root of the path, or resolve every part if relative
+    if parts[0] == '':
+        current = drive + sep
+        parts = parts[1:]
+    else:
+        current = drive
+
+    # Resolve each part against the cached listing of its parent
+    for part in parts:
+        if part == '' or part == os.curdir:
+            continue
+        if part == os.pardir:
+            # scandir never lists '..', so keep it as written
+            current = os.path.join(current, part)
+            continue
+        name = _lookup(current or os.curdir, part)
+        if name is None:
+            return None
+        current = os.path.join(current, name)
+
+    return current
@@ -1,136 +1,971 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import functools
+import mmap
+import multiprocessing
 import os
 from pathlib import Path
+import pickle
+import queue
 import re
-from typing import Iterator, Optional
-from bs4 import BeautifulSoup
+import tempfile
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+try:
+    import hyperscan
+except ImportError:
+    hyperscan = None
+
+try:
+    import liburing
+except ImportError:
+    liburing = None
+
+# Files handled per io_uring submission; each file takes two entries
+_URING_BATCH = 64
+
+# Set per run when the tree is on a case-insensitive filesystem that can
+# report canonical case directly (see _probe_case_insensitive)
+_case_insensitive = False
+
+# References starting with these never point into the local tree; a tuple
+# so str.startswith checks them all in one C-level call. Schemes are
+# case-insensitive, so only a lowered prefix as long as 'javascript:' (11
+# characters) is compared
+_SKIP_SCHEMES = ('http:', 'https:', '//', 'data:', 'mailto:', 'tel:',
+                 'javascript:', '#', 'ftp:')
+
+# Quoted src/href attribute values; the lookbehind keeps data-src and the
+# like from matching, and IGNORECASE covers SRC/Href spellings. Whitespace
+# is HTML's ASCII set, not \s, so the bytes-based Hyperscan DFA agrees
+_ATTR_RE = re.compile(
+    r"""(?<![\w-])(src|href)([ \t\n\r\f]*=[ \t\n\r\f]*)(?:"([^"]*)"|'([^']*)')""",
+    re.IGNORECASE
+)
+
+# Byte-level pre-filter for files that may contain src/href attributes
+_REF_NAME_RE = re.compile(rb'(?i)src|href')
+
+# Separators a reference path may be written with on this platform
+_SEP_RE = re.compile('([%s])' % re.escape(os.sep + (os.altsep or '')))
+
+# Hyperscan DFA for the same attributes. It has no lookbehind or groups,
+# so it only locates spans; _ATTR_RE then checks each span and splits it
+if hyperscan is not None:
+    _ATTR_DB = hyperscan.Database()
+    _ATTR_DB.compile(
+        expressions=[
+            rb"""(src|href)[ \t\n\r\f]*=[ \t\n\r\f]*("[^"]*"|'[^']*')"""
+        ],
+        ids=[0],
+        elements=1,
+        flags=[hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_SOM_LEFTMOST]
+    )
+else:
+    _ATTR_DB = None
 
 
-def find_html_files(directory: Path) -> Iterator[Path]:
+def find_html_files(directory: Path,
+                    case_maps: Optional[Dict[str, Dict[str, str]]] = None
+                    ) -> Iterator[Path]:
     """
     Recursively find all HTML files in the given directory.
 
     Args:
         directory (Path): Starting directory for search
+        case_maps (Optional[Dict[str, Dict[str, str]]]): If given, filled
+            with the _case_map listing of every directory walked
 
     Yields:
         Path: Path objects for each HTML file found
     """
-    for path in directory.rglob('*'):
-        if path.is_file() and path.suffix.lower() in ('.html', '.htm'):
-            yield path
+    # Walk with os.scandir so the d_type from readdir is reused instead of
+    # stat-ing every entry as rglob/is_file would
+    stack = [str(directory)]
+    while stack:
+        dirpath = stack.pop()
+        try:
+            with os.scandir(dirpath) as entries:
+                names = {}
+                for entry in entries:
+                    if case_maps is not None:
+                        names[entry.name.casefold()] = entry.name
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif (entry.name.lower().endswith(('.html', '.htm'))
+                          and entry.is_file()):
+                        yield Path(entry.path)
+                if case_maps is not None:
+                    case_maps[os.path.normpath(dirpath)] = names
+        except (PermissionError, FileNotFoundError, NotADirectoryError):
+            continue
+
+
+# Listings of the whole tree, scanned once by the parent process and loaded
+# by each worker (see _init_worker); mutated in place, never rebound
+_shared_case_maps: Dict[str, Dict[str, str]] = {}
+
+
+def _list_dir(dirpath: str) -> Dict[str, str]:
+    """
+    List a directory and map casefolded entry names to actual names.
 
+    casefold() rather than lower() so e.g. 'ß' and 'SS' compare equal.
 
-def get_actual_path(path: Path) -> Optional[Path]:
+    Args:
+        dirpath (str): Directory to list
+
+    Returns:
+        Dict[str, str]: Casefolded name -> actual name, empty if unreadable
+    """
+    try:
+        with os.scandir(dirpath) as entries:
+            return {entry.name.casefold(): entry.name for entry in entries}
+    except OSError:
+        return {}
+
+
+@functools.lru_cache(maxsize=4096)
+def _case_map(dirpath: str) -> Dict[str, str]:
+    """
+    List a directory once, preferring the listing shared by the parent.
+
+    Args:
+        dirpath (str): Directory to list
+
+    Returns:
+        Dict[str, str]: Casefolded name -> actual name, empty if unreadable
+    """
+    names = _shared_case_maps.get(dirpath)
+    if names is None:
+        names = _list_dir(dirpath)
+    return names
+
+
+def _lookup(dirpath: str, name: str) -> Optional[str]:
+    """
+    Find the actual name of a directory entry, ignoring case.
+
+    Args:
+        dirpath (str): Directory to look in
+        name (str): Entry name (may have incorrect case)
+
+    Returns:
+        Optional[str]: Actual entry name, or None if not found
+    """
+    return _case_map(dirpath).get(name.casefold())
+
+
+def get_actual_path(path_str: str) -> Optional[str]:
     """
     Find the actual case-sensitive path for a given path.
 
     Args:
-        path (Path): Path to check (may have incorrect case)
+        path_str (str): Path to check (may have incorrect case)
+
+    Returns:
+        Optional[str]: Actual path with correct case, or None if not found
+    """
+    if os.altsep:
+        path_str = path_str.replace(os.altsep, os.sep)
+    drive, rest = os.path.splitdrive(path_str)
+    parts = rest.split(os.sep)
+
+    # Start from the root of the path, or resolve every part if relative
+    if parts[0] == '':
+        current = drive + os.sep
+        parts = parts[1:]
+    else:
+        current = drive
+
+    # Resolve each part against the cached listing of its parent
+    for part in parts:
+        if part in ('', os.curdir):
+            continue
+        if part == os.pardir:
+            # scandir never lists '..', so keep it as written
+            current = os.path.join(current, part)
+            continue
+        name = _lookup(current or os.curdir, part)
+        if name is None:
+            return None
+        current = os.path.join(current, name)
+
+    return current
+
+
+# Prefer the compiled helpers from _case.pyx when they have been built
+try:
+    from _case import (  # noqa: F811
+        _case_map, _list_dir, _lookup, _shared_case_maps, get_actual_path
+    )
+except ImportError:
+    pass
+
+
+def _probe_case_insensitive(directory: str) -> bool:
+    """
+    Check whether a directory is on a case-insensitive filesystem whose
+    canonical case can be asked for in one call (Windows and macOS).
+
+    Args:
+        directory (str): Directory to probe
 
     Returns:
-        Optional[Path]: Actual path with correct case, or None if not found
+        bool: True if the canonical-case fast path can be used
     """
+    if os.name != 'nt' and not hasattr(fcntl, 'F_GETPATH'):
+        return False
+
     try:
-        # Start from the root of the path
-        current = Path(path.parts[0])
-        remaining_parts = list(path.parts[1:])
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                swapped = entry.name.swapcase()
+                if swapped == entry.name:
+                    continue
+                # Both spellings naming the same file means case is ignored
+                try:
+                    return os.path.samefile(
+                        entry.path, os.path.join(directory, swapped)
+                    )
+                except OSError:
+                    return False
+    except OSError:
+        pass
+    return False
+
+
+def _init_worker(case_insensitive: bool, case_maps_file: str) -> None:
+    """
+    Set up a worker process for one run of process_directory.
 
-        # Traverse each part of the path
-        for part in remaining_parts:
-            if not current.exists() or not current.is_dir():
-                return None
+    Args:
+        case_insensitive (bool): Result of _probe_case_insensitive
+        case_maps_file (str): Pickled directory listings from the parent
+    """
+    _set_case_insensitive(case_insensitive)
 
-            # Get all entries in the current directory
-            try:
-                entries = list(current.iterdir())
-                # Find matching entry ignoring case
-                matching_entry = next(
-                    (entry for entry in entries
-                     if entry.name.lower() == part.lower()),
-                    None
-                )
+    with open(case_maps_file, 'rb') as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        case_maps = pickle.loads(mapped)
+    _shared_case_maps.clear()
+    _shared_case_maps.update(case_maps)
+
+
+def _set_case_insensitive(flag: bool) -> None:
+    """
+    Enable or disable the canonical-case fast path in this process.
+
+    Args:
+        flag (bool): Result of _probe_case_insensitive for the run
+    """
+    global _case_insensitive
+    _case_insensitive = flag
+
+
+def _canonical_path(path_str: str) -> Optional[str]:
+    """
+    Ask the filesystem for the canonical-case form of an existing path.
 
-                if matching_entry is None:
-                    return None
+    Uses os.path.realpath on Windows (GetFinalPathNameByHandleW) and the
+    F_GETPATH fcntl on macOS. Symlinks are resolved along the way.
 
-                current = matching_entry
+    Args:
+        path_str (str): Path to check (may have incorrect case)
+
+    Returns:
+        Optional[str]: Path with canonical case, or None if not found
+    """
+    if os.name == 'nt':
+        if not os.path.exists(path_str):
+            return None
+        return os.path.realpath(path_str)
 
-            except (PermissionError, OSError):
-                return None
+    try:
+        fd = os.open(path_str, os.O_RDONLY)
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+    try:
+        buf = fcntl.fcntl(fd, fcntl.F_GETPATH, bytes(1024))
+    finally:
+        os.close(fd)
+    return os.fsdecode(buf.split(b'\0', 1)[0])
 
-        return current if current.exists() else None
 
-    except Exception:
+@functools.lru_cache(maxsize=4096)
+def _canonical_dir(dirpath: str) -> Optional[str]:
+    """
+    Canonical-case form of a directory references are resolved against,
+    memoized since every reference from its files needs it.
+
+    Args:
+        dirpath (str): Directory to check (may have incorrect case)
+
+    Returns:
+        Optional[str]: Path with canonical case, or None if not found
+    """
+    return _canonical_path(dirpath)
+
+
+@functools.lru_cache(maxsize=65536)
+def _resolve(parent: str, ref: str) -> Optional[str]:
+    """
+    Resolve a reference relative to a directory, memoized across files.
+
+    Args:
+        parent (str): Directory the reference is relative to
+        ref (str): Referenced path (may have incorrect case)
+
+    Returns:
+        Optional[str]: Actual path with correct case, or None if not found
+    """
+    full_path = os.path.join(parent, ref)
+    if not _case_insensitive:
+        return get_actual_path(full_path)
+
+    # One call instead of a listing per component; re-express the result
+    # under parent since the canonical form has symlinks resolved
+    try:
+        actual_path = _canonical_path(full_path)
+        if actual_path is None:
+            return None
+        relative_path = Path(actual_path).relative_to(_canonical_dir(parent))
+    except (OSError, TypeError, ValueError):
+        # Unreadable or reached through a symlink, walk it instead
+        return get_actual_path(full_path)
+    return os.path.join(parent, relative_path)
+
+
+def _find_attributes(content: str,
+                     data: Optional[bytes] = None) -> Iterator['re.Match[str]']:
+    """
+    Find the quoted src/href attributes in HTML content.
+
+    Scans with Hyperscan when it is installed, falling back to _ATTR_RE.
+
+    Args:
+        content (str): HTML content to search
+        data (Optional[bytes]): The content as UTF-8, if already at hand
+
+    Yields:
+        re.Match[str]: Non-overlapping _ATTR_RE matches, in order
+    """
+    if _ATTR_DB is None:
+        yield from _ATTR_RE.finditer(content)
+        return
+
+    if data is None:
+        data = content.encode('utf-8', 'surrogatepass')
+    spans = []
+    _ATTR_DB.scan(
+        data,
+        match_event_handler=lambda id_, start, end, flags, ctx:
+            spans.append((start, end))
+    )
+    # Matches are reported by end offset and may nest; sort them so the
+    # leftmost wins like finditer
+    spans.sort()
+
+    ascii_only = content.isascii()
+    byte_pos = char_pos = last_end = 0
+    for start, end in spans:
+        if not ascii_only:
+            # Map byte offsets to str offsets incrementally
+            char_pos += len(data[byte_pos:start].decode('utf-8', 'surrogatepass'))
+            byte_pos = start
+            char_start = char_pos
+            char_end = char_start + len(
+                data[start:end].decode('utf-8', 'surrogatepass')
+            )
+        else:
+            char_start, char_end = start, end
+
+        if char_start < last_end:
+            continue
+        # Lookbehind in _ATTR_RE still sees the text before char_start
+        match = _ATTR_RE.match(content, char_start, char_end)
+        if match is not None and match.end() == char_end:
+            last_end = char_end
+            yield match
+
+
+class _Ref:
+    """A local reference found in HTML content, pending resolution."""
+
+    __slots__ = ('match', 'path', 'name', 'suffix')
+
+    def __init__(self, match: 're.Match[str]', path: str, name: str,
+                 suffix: str):
+        # Attribute match, path as written, file name to look up, and the
+        # query/fragment or trailing slash to put back after it
+        self.match = match
+        self.path = path
+        self.name = name
+        self.suffix = suffix
+
+
+def _rewrite(ref_path: str, actual_path: str, base: str) -> Optional[str]:
+    """
+    Apply the case of a resolved path to a reference as it was written.
+
+    Only component names change; separators, '.' and '..' stay as written,
+    so a reference that is already correct comes back unchanged.
+
+    Args:
+        ref_path (str): Reference as written, relative to base
+        actual_path (str): Resolved path with correct case
+        base (str): Directory the reference is relative to
+
+    Returns:
+        Optional[str]: Corrected reference, or None if the two do not line up
+    """
+    try:
+        actual_parts = iter(Path(actual_path).relative_to(base).parts)
+    except ValueError:
+        # Path is not relative, keep original
+        return None
+
+    pieces = _SEP_RE.split(ref_path)
+    # Even indexes are components, odd ones the separators between them
+    for i in range(0, len(pieces), 2):
+        if pieces[i] in ('', os.curdir):
+            continue
+        actual_name = next(actual_parts, None)
+        if actual_name is None or actual_name.casefold() != pieces[i].casefold():
+            return None
+        pieces[i] = actual_name
+
+    if next(actual_parts, None) is not None:
         return None
+    return ''.join(pieces)
 
 
-def correct_file_references(content: str, html_file: Path) -> str:
+def correct_file_references(content: str, html_file: Path,
+                            data: Optional[bytes] = None) -> Optional[str]:
     """
     Correct case sensitivity in file references within HTML content.
 
+    Only the quoted src/href values are rewritten; everything else in the
+    content is left byte-for-byte as it was. References are grouped by the
+    directory they point into so each directory is resolved and listed
+    once per file.
+
     Args:
         content (str): HTML content to process
         html_file (Path): Path to the HTML file being processed
+        data (Optional[bytes]): The content as UTF-8, if already at hand,
+            so it need not be encoded again for scanning
 
     Returns:
-        str: Corrected HTML content
+        Optional[str]: Corrected HTML content, or None if nothing changed
     """
-    soup = BeautifulSoup(content, 'html.parser')
+    base = str(html_file.parent)
+
+    # Group local references by the directory part of their path
+    buckets: Dict[str, List[_Ref]] = {}
+    for match in _find_attributes(content, data):
+        ref_path = match.group(3) if match.group(3) is not None else match.group(4)
+        if not ref_path or ref_path[:11].lower().startswith(_SKIP_SCHEMES):
+            continue
+
+        # Look up only the file part; query, fragment and any trailing
+        # slash are put back after
+        file_part = ref_path.split('#', 1)[0].split('?', 1)[0].rstrip('/')
+        if not file_part:
+            continue
+        ref_dir, name = os.path.split(file_part)
+        buckets.setdefault(ref_dir, []).append(
+            _Ref(match, file_part, name, ref_path[len(file_part):])
+        )
+
+    replacements = []
+    for ref_dir, refs in buckets.items():
+        actual_dir = _resolve(base, ref_dir) if ref_dir else base
+        if actual_dir is None:
+            continue
+
+        for ref in refs:
+            actual_name = _lookup(actual_dir, ref.name)
+            if actual_name is None:
+                continue
+
+            corrected_path = _rewrite(
+                ref.path, os.path.join(actual_dir, actual_name), base
+            )
+            if corrected_path is None:
+                continue
+
+            # Keep the attribute name, spacing and quotes exactly as written
+            match = ref.match
+            quote = '"' if match.group(3) is not None else "'"
+            text = (f"{match.group(1)}{match.group(2)}"
+                    f"{quote}{corrected_path}{ref.suffix}{quote}")
+            if text != match.group(0):
+                replacements.append((match.start(), match.end(), text))
+
+    # None means every reference was already correct
+    if not replacements:
+        return None
 
-    # Process all tags with src or href attributes
-    for tag in soup.find_all():
-        # Get original attribute names to preserve case
-        orig_attrs = set()
-        for attr in tag.attrs:
-            if attr.lower() in ('src', 'href'):
-                orig_attrs.add(attr)
+    replacements.sort()
+    pieces = []
+    last = 0
+    for start, end, text in replacements:
+        pieces.append(content[last:start])
+        pieces.append(text)
+        last = end
+    pieces.append(content[last:])
+    return ''.join(pieces)
 
-        # Process each attribute
-        for attr in orig_attrs:
-            if tag.get(attr):
-                ref_path = tag[attr]
-                # Convert to Path object relative to HTML file location
-                full_path = html_file.parent / ref_path
 
-                # Find actual path with correct case
-                actual_path = get_actual_path(full_path)
-                if actual_path:
-                    # Convert back to relative path and update attribute
-                    try:
-                        relative_path = actual_path.relative_to(html_file.parent)
-                        tag[attr] = str(relative_path)
-                    except ValueError:
-                        # Path is not relative, keep original
-                        pass
+def _read_bytes(path: str) -> bytes:
+    """
+    Read a whole file with raw os calls, skipping the buffered IO layer.
 
-    # Use minimal HTML output
-    return str(soup).replace('/>', '>')
+    Args:
+        path (str): File to read
 
+    Returns:
+        bytes: File contents
+    """
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        chunks = [os.read(fd, os.fstat(fd).st_size + 1)]
+        # Keep reading in case the file grew since the fstat
+        while chunks[-1]:
+            chunks.append(os.read(fd, 65536))
+        return b''.join(chunks)
+    finally:
+        os.close(fd)
 
-def process_directory(start_dir: Path) -> None:
+
+def _write_bytes(path: str, data: bytes) -> None:
     """
-    Process all HTML files in a directory tree and correct case sensitivity.
+    Overwrite a file with raw os calls, skipping the buffered IO layer.
 
     Args:
-        start_dir (Path): Starting directory for processing
+        path (str): File to write
+        data (bytes): New contents
+    """
+    fd = os.open(path, os.O_WRONLY | os.O_TRUNC | os.O_CREAT, 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+
+
+def _uring_wait(ring: 'liburing.Ring', cqe: 'liburing.Cqe',
+                count: int) -> Dict[int, Union[int, OSError]]:
     """
-    for html_file in find_html_files(start_dir):
+    Reap a number of completions from an io_uring.
+
+    Args:
+        ring (liburing.Ring): Ring the requests were submitted to
+        cqe (liburing.Cqe): Completion entry buffer
+        count (int): Number of completions to wait for
+
+    Returns:
+        Dict[int, Union[int, OSError]]: user_data -> result or error
+    """
+    results = {}
+    while len(results) < count:
+        liburing.io_uring_wait_cqe(ring, cqe)
+        entry = cqe[0]
         try:
-            # Read the file with UTF-8 encoding
-            content = html_file.read_text(encoding='utf-8')
+            results[entry.user_data] = entry.res
+        except OSError as e:
+            # Negative results are raised as the matching OSError
+            results[entry.user_data] = e
+        liburing.io_uring_cqe_seen(ring, entry)
+    return results
 
-            # Correct references
-            corrected_content = correct_file_references(content, html_file)
 
-            # Write back only if changes were made
-            if content != corrected_content:
-                html_file.write_text(corrected_content, encoding='utf-8')
+def _uring_read_result(path: str, result: Union[int, OSError], size: int,
+                       buffer: Optional[bytearray]) -> Union[bytes, OSError]:
+    """
+    Turn the completion of one io_uring read into the file's contents.
 
-        except (PermissionError, UnicodeDecodeError) as e:
-            # Re-raise permission errors, but maybe log other errors
-            if isinstance(e, PermissionError):
+    Args:
+        path (str): File that was read
+        result (Union[int, OSError]): Bytes read, or the open/read error
+        size (int): File size reported by statx before the read
+        buffer (Optional[bytearray]): Buffer the read filled
+
+    Returns:
+        Union[bytes, OSError]: Contents, or the error naming the file
+    """
+    if isinstance(result, OSError):
+        return OSError(result.errno, result.strerror, path)
+    if result != size:
+        # The file grew or shrank since the statx; anything but exactly
+        # the expected size may be partial, so read it again to EOF
+        try:
+            return _read_bytes(path)
+        except OSError as e:
+            return e
+    return bytes(buffer[:result])
+
+
+def _uring_read_files(paths: List[str]) -> List[Union[bytes, OSError]]:
+    """
+    Read whole files through io_uring, batching the syscalls.
+
+    Each group of files is read in two submissions: statx + open for every
+    file, then a read hard-linked to its close.
+
+    Args:
+        paths (List[str]): Files to read
+
+    Returns:
+        List[Union[bytes, OSError]]: Contents, or the error, for each file
+    """
+    results: List[Union[bytes, OSError]] = []
+    ring, cqe = liburing.Ring(), liburing.Cqe()
+    liburing.io_uring_queue_init(2 * _URING_BATCH, ring)
+    try:
+        for start in range(0, len(paths), _URING_BATCH):
+            group = paths[start:start + _URING_BATCH]
+
+            # Stat and open every file in one go
+            stats = [liburing.Statx() for _ in group]
+            for i, path in enumerate(group):
+                sqe = liburing.io_uring_get_sqe(ring)
+                liburing.io_uring_prep_statx(sqe, stats[i], path)
+                sqe.user_data = 2 * i
+                sqe = liburing.io_uring_get_sqe(ring)
+                liburing.io_uring_prep_open(sqe, path, liburing.O_RDONLY)
+                sqe.user_data = 2 * i + 1
+            liburing.io_uring_submit(ring)
+            opened = _uring_wait(ring, cqe, 2 * len(group))
+
+            # Read each opened file; one spare byte detects files that grew
+            # since the statx, and the hard link closes the fd regardless.
+            # _uring_read_result re-reads any file not exactly that size
+            fds = {i: opened[2 * i + 1] for i in range(len(group))
+                   if not isinstance(opened[2 * i + 1], OSError)}
+            buffers = {}
+            try:
+                for i, fd in fds.items():
+                    buffers[i] = bytearray(stats[i].size + 1)
+                    sqe = liburing.io_uring_get_sqe(ring)
+                    liburing.io_uring_prep_read(sqe, fd, buffers[i])
+                    liburing.io_uring_sqe_set_flags(
+                        sqe, liburing.IOSQE_IO_HARDLINK
+                    )
+                    sqe.user_data = 2 * i
+                    sqe = liburing.io_uring_get_sqe(ring)
+                    liburing.io_uring_prep_close(sqe, fd)
+                    sqe.user_data = 2 * i + 1
+                liburing.io_uring_submit(ring)
+            except BaseException:
+                # The closes were never submitted, so do not leak the fds
+                for fd in fds.values():
+                    os.close(fd)
+                raise
+            read = _uring_wait(ring, cqe, 2 * len(buffers))
+
+            for i, path in enumerate(group):
+                results.append(_uring_read_result(
+                    path, read.get(2 * i, opened[2 * i + 1]),
+                    stats[i].size, buffers.get(i)
+                ))
+    finally:
+        liburing.io_uring_queue_exit(ring)
+    return results
+
+
+def _uring_write_files(items: List[Tuple[str, bytes]]) -> List[Optional[OSError]]:
+    """
+    Overwrite whole files through io_uring, batching the syscalls.
+
+    Each group of files is written in three submissions: open every file,
+    write it, then truncate it to the new length hard-linked to its close.
+    Files are not opened with O_TRUNC, so an interrupted run never leaves
+    one empty.
+
+    Args:
+        items (List[Tuple[str, bytes]]): Files and their new contents
+
+    Returns:
+        List[Optional[OSError]]: The error, or None, for each file
+    """
+    results: List[Optional[OSError]] = []
+    ring, cqe = liburing.Ring(), liburing.Cqe()
+    liburing.io_uring_queue_init(2 * _URING_BATCH, ring)
+    try:
+        for start in range(0, len(items), _URING_BATCH):
+            group = items[start:start + _URING_BATCH]
+
+            for i, (path, _) in enumerate(group):
+                sqe = liburing.io_uring_get_sqe(ring)
+                liburing.io_uring_prep_open(sqe, path, liburing.O_WRONLY)
+                sqe.user_data = i
+            liburing.io_uring_submit(ring)
+            opened = _uring_wait(ring, cqe, len(group))
+            fds = {i: fd for i, fd in opened.items()
+                   if not isinstance(fd, OSError)}
+
+            try:
+                for i, fd in fds.items():
+                    sqe = liburing.io_uring_get_sqe(ring)
+                    liburing.io_uring_prep_write(sqe, fd, group[i][1])
+                    sqe.user_data = i
+                liburing.io_uring_submit(ring)
+                written = _uring_wait(ring, cqe, len(fds))
+
+                # Cut off what is left of the old contents only once the
+                # new ones are fully written; the hard link closes the fd
+                # regardless
+                pending = 0
+                for i, fd in fds.items():
+                    if written[i] == len(group[i][1]):
+                        sqe = liburing.io_uring_get_sqe(ring)
+                        liburing.io_uring_prep_ftruncate(sqe, fd, written[i])
+                        liburing.io_uring_sqe_set_flags(
+                            sqe, liburing.IOSQE_IO_HARDLINK
+                        )
+                        sqe.user_data = 2 * i
+                        pending += 1
+                    sqe = liburing.io_uring_get_sqe(ring)
+                    liburing.io_uring_prep_close(sqe, fd)
+                    sqe.user_data = 2 * i + 1
+                    pending += 1
+                liburing.io_uring_submit(ring)
+            except BaseException:
+                # The closes were never submitted, so do not leak the fds
+                for fd in fds.values():
+                    os.close(fd)
                 raise
-            print(f"Error processing {html_file}: {e}")
+            truncated = _uring_wait(ring, cqe, pending)
+
+            for i, (path, data) in enumerate(group):
+                result = written.get(i, opened[i])
+                if isinstance(result, OSError):
+                    results.append(OSError(result.errno, result.strerror, path))
+                    continue
+                try:
+                    if result < len(data):
+                        # Short write, finish it the ordinary way
+                        _write_bytes(path, data)
+                    elif isinstance(truncated.get(2 * i), OSError):
+                        # Kernels before 6.9 have no io_uring ftruncate
+                        os.truncate(path, len(data))
+                except OSError as e:
+                    results.append(e)
+                else:
+                    results.append(None)
+    finally:
+        liburing.io_uring_queue_exit(ring)
+    return results
+
+
+@functools.lru_cache(maxsize=1)
+def _io_executor() -> ThreadPoolExecutor:
+    """
+    Thread pool for plain file I/O, created once per worker process.
+
+    Returns:
+        ThreadPoolExecutor: Shared executor for reads and writes
+    """
+    return ThreadPoolExecutor(max_workers=8)
+
+
+def _read_files(paths: List[str]) -> Iterator[Tuple[str, Union[bytes, OSError]]]:
+    """
+    Read whole files, through io_uring when liburing is available.
+
+    Without io_uring the reads run on a thread pool and are yielded as
+    they complete, so processing one file overlaps reading the next.
+
+    Args:
+        paths (List[str]): Files to read
+
+    Yields:
+        Tuple[str, Union[bytes, OSError]]: Each file and its contents, or
+            the error hit while reading it
+    """
+    if liburing is not None:
+        try:
+            results = _uring_read_files(paths)
+        except OSError:
+            # io_uring can be disabled by the kernel or a seccomp filter
+            pass
+        else:
+            yield from zip(paths, results)
+            return
+
+    # os.read releases the GIL, so the reads genuinely overlap
+    futures = {_io_executor().submit(_read_bytes, path): path for path in paths}
+    for future in as_completed(futures):
+        try:
+            yield futures[future], future.result()
+        except OSError as e:
+            yield futures[future], e
+
+
+def _write_files(items: List[Tuple[str, bytes]]) -> List[Optional[OSError]]:
+    """
+    Overwrite whole files, through io_uring when liburing is available.
+
+    Without io_uring the writes run on a thread pool.
+
+    Args:
+        items (List[Tuple[str, bytes]]): Files and their new contents
+
+    Returns:
+        List[Optional[OSError]]: The error, or None, for each file
+    """
+    if liburing is not None:
+        try:
+            return _uring_write_files(items)
+        except OSError:
+            pass
+
+    futures = [_io_executor().submit(_write_bytes, path, data)
+               for path, data in items]
+    results: List[Optional[OSError]] = []
+    for future in futures:
+        try:
+            future.result()
+            results.append(None)
+        except OSError as e:
+            results.append(e)
+    return results
+
+
+def _process_batch(html_files: List[str]) -> List[Tuple[str, Optional[Exception]]]:
+    """
+    Read, correct and write back a batch of HTML files.
+
+    Args:
+        html_files (List[str]): Paths to the HTML files (cheap to pickle)
+
+    Returns:
+        List[Tuple[str, Optional[Exception]]]: Each file and the error hit
+            while processing it, or None
+    """
+    errors: Dict[str, Optional[Exception]] = {}
+    writes: List[Tuple[str, bytes]] = []
+
+    for html_file, raw in _read_files(html_files):
+        errors[html_file] = None
+        try:
+            if isinstance(raw, OSError):
+                raise raw
+
+            # Cheap byte-level check before decoding; attribute names are
+            # ASCII and may be any case or followed by spaces before '='
+            if not _REF_NAME_RE.search(raw):
+                continue
+
+            # Decode as UTF-8 and correct references; the raw bytes are
+            # exactly that content's encoding, so they are scanned as is
+            corrected_content = correct_file_references(
+                raw.decode('utf-8'), Path(html_file), raw
+            )
+
+            # None means every reference was already correct
+            if corrected_content is not None:
+                writes.append((html_file, corrected_content.encode('utf-8')))
+
+        except (PermissionError, UnicodeDecodeError) as e:
+            # Hand the error back so the parent process decides what to do
+            errors[html_file] = e
+
+    if writes:
+        for (html_file, _), error in zip(writes, _write_files(writes)):
+            if isinstance(error, PermissionError):
+                errors[html_file] = error
+            elif error is not None:
+                raise error
+
+    return list(errors.items())
+
+
+def process_directory(start_dir: Path) -> None:
+    """
+    Process all HTML files in a directory tree and correct case sensitivity.
+
+    Files are processed in parallel across a pool of worker processes.
+
+    Args:
+        start_dir (Path): Starting directory for processing
+    """
+    # Listings and lookups may be stale if files were renamed since last run
+    _case_map.cache_clear()
+    _resolve.cache_clear()
+    _canonical_dir.cache_clear()
+
+    # Keep the listings from the walk so workers need not rescan the tree
+    case_maps: Dict[str, Dict[str, str]] = {}
+    html_files = [str(path) for path in find_html_files(start_dir, case_maps)]
+    if not html_files:
+        return
+    batches = [html_files[i:i + _URING_BATCH]
+               for i in range(0, len(html_files), _URING_BATCH)]
+
+    # Case-insensitive filesystems can report canonical case directly; only
+    # the workers act on this, so it is not set in (and cannot leak out of)
+    # the calling process
+    case_insensitive = _probe_case_insensitive(str(start_dir))
+
+    case_maps_file = None
+    try:
+        with tempfile.NamedTemporaryFile(suffix='.pickle', delete=False) as f:
+            case_maps_file = f.name
+            pickle.dump(case_maps, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+        # Each worker loads every listing, so start no more than there are
+        # batches to hand out
+        processes = min(os.cpu_count() or 1, len(batches))
+        first_error: Optional[BaseException] = None
+        with multiprocessing.Pool(
+                processes,
+                initializer=_init_worker,
+                initargs=(case_insensitive, case_maps_file)) as pool:
+            # Hand out a couple of batches per worker at a time so that
+            # after an error no new batch is started and the ones in flight
+            # can finish: terminating the pool could kill a worker between
+            # truncating a file and writing it back
+            done: 'queue.SimpleQueue[object]' = queue.SimpleQueue()
+            pending = iter(batches)
+            in_flight = 0
+            while True:
+                while first_error is None and in_flight < 2 * processes:
+                    batch = next(pending, None)
+                    if batch is None:
+                        break
+                    pool.apply_async(_process_batch, (batch,),
+                                     callback=done.put, error_callback=done.put)
+                    in_flight += 1
+                if not in_flight:
+                    break
+
+                results = done.get()
+                in_flight -= 1
+                if isinstance(results, BaseException):
+                    first_error = first_error or results
+                    continue
+                for html_file, error in results:
+                    # Re-raise permission errors, but maybe log other errors
+                    if isinstance(error, PermissionError):
+                        first_error = first_error or error
+                    elif error is not None:
+                        print(f"Error processing {html_file}: {error}")
+            pool.close()
+            pool.join()
+
+        if first_error is not None:
+            raise first_error
+    finally:
+        if case_maps_file is not None:
+            os.unlink(case_maps_file)
 
 
 def main():
@@ -0,0 +1,22 @@
+"""
+Build the optional compiled case-matching helpers:
+
+    python setup.py build_ext --inplace
+
+html_filename_change works without them, so the extension is only built
+when Cython is installed.
+"""
+from setuptools import setup
+
+try:
+    from Cython.Build import cythonize
+except ImportError:
+    ext_modules = []
+else:
+    ext_modules = cythonize('_case.pyx')
+
+setup(
+    name='html-case-corrector',
+    py_modules=['html_filename_change'],
+    ext_modules=ext_modules,
+)
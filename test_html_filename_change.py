@@ -1,7 +1,11 @@
 import os
+import pickle
+import random
+import time
 import pytest
 from pathlib import Path
 from bs4 import BeautifulSoup
+import html_filename_change
 from html_filename_change import (
     find_html_files,
     correct_file_references,
@@ -10,6 +14,15 @@ from html_filename_change import (
 )
 
 
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """Start each test with empty listing and lookup caches, as each
+    process_directory run does."""
+    html_filename_change._case_map.cache_clear()
+    html_filename_change._resolve.cache_clear()
+    html_filename_change._canonical_dir.cache_clear()
+
+
 @pytest.fixture
 def tmp_html_structure(tmp_path):
     """Create a temporary directory structure with HTML files for testing."""
@@ -52,12 +65,35 @@ def test_get_actual_path(tmp_html_structure):
     """Test finding actual case-sensitive path."""
     # Test existing file with incorrect case
     test_path = tmp_html_structure / "images" / "test_image.jpg"
-    actual_path = get_actual_path(test_path)
-    assert actual_path.name == "Test_Image.jpg"
+    actual_path = get_actual_path(str(test_path))
+    assert actual_path == str(tmp_html_structure / "Images" / "Test_Image.jpg")
 
     # Test non-existent file
     non_existent = tmp_html_structure / "nonexistent.txt"
-    assert get_actual_path(non_existent) is None
+    assert get_actual_path(str(non_existent)) is None
+
+
+def test_get_actual_path_new_entry(tmp_html_structure):
+    """Test that entries created after a lookup are found once the cached
+    listings are cleared."""
+    test_path = str(tmp_html_structure / "images" / "new.jpg")
+    assert get_actual_path(test_path) is None
+
+    (tmp_html_structure / "Images" / "New.jpg").write_text("")
+    assert get_actual_path(test_path) is None
+
+    html_filename_change._case_map.cache_clear()
+    assert get_actual_path(test_path) == str(
+        tmp_html_structure / "Images" / "New.jpg"
+    )
+
+
+def test_get_actual_path_casefold(tmp_html_structure):
+    """Test matching names that only compare equal when casefolded."""
+    (tmp_html_structure / "Straße.jpg").write_text("")
+
+    actual_path = get_actual_path(str(tmp_html_structure / "STRASSE.JPG"))
+    assert actual_path == str(tmp_html_structure / "Straße.jpg")
 
 
 def test_correct_file_references(tmp_html_structure):
@@ -86,6 +122,95 @@ def test_process_directory(tmp_html_structure):
     assert 'SubDir/Page2.html' in main_html
 
 
+def test_correct_file_references_preserves_formatting(tmp_html_structure):
+    """Test that only src/href values change and other markup is untouched."""
+    html_content = (
+        "<IMG Src = 'images/test_image.jpg' data-src=\"images/icon.png\"/>\n"
+        '<a href="http://example.com/images/icon.png">x</a><br/>\n'
+    )
+
+    corrected = correct_file_references(
+        html_content,
+        tmp_html_structure / "index.html"
+    )
+
+    assert corrected == html_content.replace(
+        "images/test_image.jpg", "Images/Test_Image.jpg"
+    )
+
+
+def test_correct_file_references_new_target(tmp_html_structure):
+    """Test that a missing target created between runs is then found."""
+    html_content = '<img src="images/new.png">'
+    html_file = tmp_html_structure / "index.html"
+
+    assert correct_file_references(html_content, html_file) is None
+
+    (tmp_html_structure / "Images" / "New.png").write_text("")
+    html_filename_change._case_map.cache_clear()
+    html_filename_change._resolve.cache_clear()
+    assert correct_file_references(html_content, html_file) == (
+        '<img src="Images/New.png">'
+    )
+
+
+def test_correct_file_references_caches_misses(tmp_html_structure,
+                                              monkeypatch):
+    """Test that references to missing files are not looked up again."""
+    html_content = ('<a href="../"><link href="/css/site.css">'
+                    '<img src="images/missing.png">')
+    html_file = tmp_html_structure / "index.html"
+    assert correct_file_references(html_content, html_file) is None
+
+    scandirs = []
+    real_scandir = os.scandir
+    monkeypatch.setattr(os, "scandir",
+                        lambda path: scandirs.append(path) or real_scandir(path))
+    assert correct_file_references(html_content, html_file) is None
+    assert scandirs == []
+
+
+def test_correct_file_references_keeps_written_form(tmp_html_structure):
+    """Test that only component names change, not how the path is written."""
+    html_file = tmp_html_structure / "index.html"
+
+    assert correct_file_references(
+        '<img src="./Images/Test_Image.jpg">', html_file
+    ) is None
+    assert correct_file_references(
+        '<img src="./images//test_image.jpg">', html_file
+    ) == '<img src="./Images//Test_Image.jpg">'
+    assert correct_file_references(
+        '<img src="../images/test_image.jpg">',
+        tmp_html_structure / "SubDir" / "Page2.html"
+    ) == '<img src="../Images/Test_Image.jpg">'
+
+
+def test_correct_file_references_skips_schemes(tmp_html_structure):
+    """Test that URL schemes are recognised in any case."""
+    if os.name == "nt":
+        pytest.skip("':' is not allowed in Windows file names")
+    (tmp_html_structure / "Mailto:a.png").write_text("")
+
+    assert correct_file_references(
+        '<a href="MAILTO:a.png"><a href="mailto:A.PNG">',
+        tmp_html_structure / "index.html"
+    ) is None
+
+
+def test_correct_file_references_unchanged(tmp_html_structure):
+    """Test that content with correct references reports no change."""
+    html_content = (
+        '<img src="Images/Test_Image.jpg"><a href="missing.html">'
+        '<a href="tel:123"><a href="javascript:void(0)"><a href="">'
+    )
+
+    assert correct_file_references(
+        html_content,
+        tmp_html_structure / "index.html"
+    ) is None
+
+
 @pytest.mark.parametrize("html_content,expected_path", [
     (
             '<img src="test.jpg">',
@@ -103,6 +228,14 @@ def test_process_directory(tmp_html_structure):
             '<img src="test.jpg" href="page.html">',
             'Test.jpg'
     ),
+    (
+            '<a href="subdir/page.html?lang=en#top">',
+            'SubDir/Page.html?lang=en#top'
+    ),
+    (
+            '<a href="subdir/">',
+            'SubDir/'
+    ),
 ])
 def test_correct_file_references_parametrized(tmp_html_structure, html_content, expected_path):
     """Test HTML pattern corrections with various inputs.
@@ -134,6 +267,22 @@ def test_correct_file_references_parametrized(tmp_html_structure, html_content,
     assert found, f"Expected path {expected_path} not found in result: {result}"
 
 
+def test_process_directory_parent_relative(tmp_html_structure, monkeypatch):
+    """Test processing a start directory given relative to a subdirectory."""
+    monkeypatch.chdir(tmp_html_structure / "SubDir")
+
+    relative_path = os.path.join("..", "images", "test_image.jpg")
+    assert get_actual_path(relative_path) == os.path.join(
+        "..", "Images", "Test_Image.jpg"
+    )
+
+    process_directory(Path(".."))
+    main_html = (tmp_html_structure / "index.html").read_text()
+
+    assert 'Images/Test_Image.jpg' in main_html
+    assert 'SubDir/Page2.html' in main_html
+
+
 def test_process_directory_with_symlinks(tmp_path):
     """Test processing with symbolic links."""
     real_dir = tmp_path / "RealDir"
@@ -167,6 +316,77 @@ def test_error_handling(tmp_html_structure):
         pass
 
 
+def test_process_directory_error_finishes_writes(tmp_path, monkeypatch):
+    """Test that a permission error lets files being written finish."""
+    for i in range(16):
+        (tmp_path / f"page{i}.html").write_text('<img src="IMAGE.JPG">')
+    (tmp_path / "Image.jpg").write_text("")
+    (tmp_path / "denied.html").write_text('<img src="image.jpg">')
+
+    real_read_bytes = html_filename_change._read_bytes
+
+    def read_bytes(path):
+        if path.endswith("denied.html"):
+            raise PermissionError(13, "Permission denied", path)
+        return real_read_bytes(path)
+
+    def slow_write_bytes(path, data):
+        # Leave the file truncated for a while before writing it
+        fd = os.open(path, os.O_WRONLY | os.O_TRUNC)
+        try:
+            time.sleep(0.2)
+            os.write(fd, data)
+        finally:
+            os.close(fd)
+
+    monkeypatch.setattr(html_filename_change, "_URING_BATCH", 1)
+    monkeypatch.setattr(html_filename_change, "liburing", None)
+    monkeypatch.setattr(html_filename_change.os, "cpu_count", lambda: 4)
+    monkeypatch.setattr(html_filename_change, "_read_bytes", read_bytes)
+    monkeypatch.setattr(html_filename_change, "_write_bytes", slow_write_bytes)
+
+    with pytest.raises(PermissionError):
+        process_directory(tmp_path)
+
+    for i in range(16):
+        assert (tmp_path / f"page{i}.html").read_text() in (
+            '<img src="IMAGE.JPG">', '<img src="Image.jpg">'
+        )
+
+
+def test_process_directory_pool_size(tmp_path, monkeypatch):
+    """Test that no pool is started without HTML files, and that it is no
+    larger than the number of batches."""
+    pools = []
+
+    class Pool:
+        def __init__(self, processes, *args, **kwargs):
+            pools.append(processes)
+            raise RuntimeError("stop")
+
+    monkeypatch.setattr(html_filename_change.multiprocessing, "Pool", Pool)
+    monkeypatch.setattr(html_filename_change.os, "cpu_count", lambda: 32)
+
+    process_directory(tmp_path)
+    assert pools == []
+
+    (tmp_path / "index.html").write_text("")
+    with pytest.raises(RuntimeError):
+        process_directory(tmp_path)
+    assert pools == [1]
+
+
+def test_process_directory_skips_files_without_refs(tmp_html_structure):
+    """Test that files without src/href are not decoded or rewritten."""
+    no_refs = tmp_html_structure / "plain.html"
+    no_refs.write_bytes(b"<p>caf\xe9</p>")
+
+    process_directory(tmp_html_structure)
+
+    assert no_refs.read_bytes() == b"<p>caf\xe9</p>"
+    assert 'Images/Test_Image.jpg' in (tmp_html_structure / "index.html").read_text()
+
+
 def test_utf8_encoding(tmp_html_structure):
     """Test handling of UTF-8 encoded files with special characters."""
     html_content = """
@@ -192,3 +412,243 @@ def test_utf8_encoding(tmp_html_structure):
     assert 'src="Имя файла.jpg"' in corrected_content
     assert 'href="Подпапка/Страница.html"' in corrected_content
 
+
+
+def test_uring_read_result(tmp_path):
+    """Test turning io_uring read completions into file contents."""
+    path = tmp_path / "page.html"
+    path.write_bytes(b"<p>full contents</p>")
+
+    # Exact size: the buffer is the file
+    buffer = bytearray(b"<p>full contents</p>\0")
+    assert html_filename_change._uring_read_result(
+        str(path), 20, 20, buffer
+    ) == b"<p>full contents</p>"
+
+    # Short read or a file that grew since statx: read it again to EOF
+    for result in (5, 21):
+        assert html_filename_change._uring_read_result(
+            str(path), result, 20, buffer
+        ) == b"<p>full contents</p>"
+
+    # Errors are mapped to the matching OSError subclass naming the file
+    error = html_filename_change._uring_read_result(
+        str(path), PermissionError(13, "Permission denied"), 20, None
+    )
+    assert isinstance(error, PermissionError)
+    assert error.filename == str(path)
+
+
+def test_uring_read_write_files(tmp_path):
+    """Test batched reads and writes through io_uring."""
+    if html_filename_change.liburing is None:
+        pytest.skip("liburing not installed")
+
+    paths = []
+    for i in range(html_filename_change._URING_BATCH + 5):
+        path = tmp_path / f"page{i}.html"
+        path.write_bytes(b"x" * i)
+        paths.append(str(path))
+    missing = str(tmp_path / "missing.html")
+
+    try:
+        results = html_filename_change._uring_read_files(paths + [missing])
+    except OSError:
+        pytest.skip("io_uring not available")
+
+    assert results[:-1] == [b"x" * i for i in range(len(paths))]
+    assert isinstance(results[-1], FileNotFoundError)
+    assert results[-1].filename == missing
+
+    errors = html_filename_change._uring_write_files(
+        [(path, b"new") for path in paths] + [(missing, b"new")]
+    )
+    assert errors[:-1] == [None] * len(paths)
+    assert isinstance(errors[-1], FileNotFoundError)
+    assert all(Path(path).read_bytes() == b"new" for path in paths)
+
+
+@pytest.mark.parametrize("failing_submit, expected", [
+    # Before the writes, and between the writes and the truncation
+    (2, b"old contents"),
+    (3, b"new contents"),
+])
+def test_uring_write_files_interrupted(tmp_path, monkeypatch, failing_submit,
+                                       expected):
+    """Test that an interrupted io_uring write never leaves a file empty
+    and closes the files it opened."""
+    liburing = html_filename_change.liburing
+    if liburing is None:
+        pytest.skip("liburing not installed")
+    if not os.path.isdir("/proc/self/fd"):
+        pytest.skip("Cannot count open file descriptors")
+
+    paths = []
+    for i in range(3):
+        path = tmp_path / f"page{i}.html"
+        path.write_bytes(b"old contents")
+        paths.append(str(path))
+
+    submits = []
+    real_submit = liburing.io_uring_submit
+
+    def submit(ring):
+        submits.append(ring)
+        if len(submits) == failing_submit:
+            raise KeyboardInterrupt
+        return real_submit(ring)
+
+    monkeypatch.setattr(liburing, "io_uring_submit", submit)
+    open_fds = len(os.listdir("/proc/self/fd"))
+    try:
+        with pytest.raises(KeyboardInterrupt):
+            html_filename_change._uring_write_files(
+                [(path, b"new") for path in paths]
+            )
+    except OSError:
+        pytest.skip("io_uring not available")
+
+    assert len(os.listdir("/proc/self/fd")) == open_fds
+    assert all(Path(path).read_bytes() == expected for path in paths)
+
+
+def test_find_attributes_matches_regex():
+    """Test that the Hyperscan scan finds exactly what _ATTR_RE finds."""
+    if html_filename_change._ATTR_DB is None:
+        pytest.skip("hyperscan not installed")
+
+    alphabet = ['src', 'SRC', 'href', '=', '"', "'", ' ', '\n', '\xa0',
+                '\u2003', 'é', 'ü', 'a', '-', '<', '>', 'img', '/']
+    rng = random.Random(0)
+    samples = [
+        'src\xa0="<"',
+        '<img data-src="x" SRC = "é.jpg"><a href=\'ü\'>',
+        'href="src=\'a\'" src="b"',
+    ] + [''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 40)))
+         for _ in range(2000)]
+
+    def spans(matches):
+        return [(m.start(), m.end(), m.groups()) for m in matches]
+
+    for sample in samples:
+        expected = spans(html_filename_change._ATTR_RE.finditer(sample))
+        assert spans(html_filename_change._find_attributes(sample)) == (
+            expected
+        ), sample
+        assert spans(html_filename_change._find_attributes(
+            sample, sample.encode("utf-8")
+        )) == expected, sample
+
+
+@pytest.fixture
+def fake_case_insensitive(monkeypatch):
+    """Pretend to be on a case-insensitive filesystem reporting canonical
+    paths under a different root, as macOS does for /tmp -> /private/tmp."""
+    root = os.path.join(os.sep, "canonical")
+
+    def canonical_path(path_str):
+        actual_path = get_actual_path(os.path.abspath(path_str))
+        if actual_path is None:
+            return None
+        return root + actual_path
+
+    monkeypatch.setattr(html_filename_change, "_canonical_path", canonical_path)
+    monkeypatch.setattr(html_filename_change, "_case_insensitive", True)
+    return canonical_path
+
+
+def test_resolve_case_insensitive(tmp_html_structure, monkeypatch,
+                                  fake_case_insensitive):
+    """Test re-expressing canonical paths under the referencing directory."""
+    parent = str(tmp_html_structure)
+    calls = []
+    monkeypatch.setattr(
+        html_filename_change, "_canonical_path",
+        lambda path_str: calls.append(path_str) or fake_case_insensitive(path_str)
+    )
+
+    assert html_filename_change._resolve(parent, "images/test_image.jpg") == (
+        os.path.join(parent, "Images", "Test_Image.jpg")
+    )
+    assert html_filename_change._resolve(parent, "subdir/page2.html") == (
+        os.path.join(parent, "SubDir", "Page2.html")
+    )
+    assert html_filename_change._resolve(parent, "missing.jpg") is None
+
+    # The referencing directory is only canonicalized once
+    assert calls.count(parent) == 1
+
+
+def test_resolve_case_insensitive_fallback(tmp_html_structure, monkeypatch,
+                                          fake_case_insensitive):
+    """Test falling back to the directory walk when the canonical path is
+    not under the referencing directory or cannot be read."""
+    parent = str(tmp_html_structure)
+    expected = os.path.join(parent, "Images", "Test_Image.jpg")
+
+    # Target reached through a symlink: canonical path lies elsewhere
+    monkeypatch.setattr(
+        html_filename_change, "_canonical_path",
+        lambda path_str: (os.path.join(os.sep, "elsewhere", "x.jpg")
+                          if path_str != parent
+                          else fake_case_insensitive(path_str))
+    )
+    assert html_filename_change._resolve(parent, "images/test_image.jpg") == (
+        expected
+    )
+
+    # Unreadable target
+    def unreadable(path_str):
+        raise PermissionError(13, "Permission denied", path_str)
+
+    html_filename_change._resolve.cache_clear()
+    monkeypatch.setattr(html_filename_change, "_canonical_path", unreadable)
+    assert html_filename_change._resolve(parent, "images/test_image.jpg") == (
+        expected
+    )
+
+
+def test_probe_case_insensitive(tmp_html_structure, monkeypatch):
+    """Test detecting a case-insensitive filesystem from a directory."""
+    directory = str(tmp_html_structure)
+    if os.name != "nt":
+        monkeypatch.setattr(html_filename_change, "fcntl",
+                            type("fcntl", (), {"F_GETPATH": 50}))
+
+    # Swapped-case names do not exist on a case-sensitive filesystem
+    monkeypatch.setattr(os.path, "samefile", lambda a, b: False)
+    assert not html_filename_change._probe_case_insensitive(directory)
+
+    monkeypatch.setattr(os.path, "samefile", lambda a, b: True)
+    assert html_filename_change._probe_case_insensitive(directory)
+
+
+def test_process_directory_case_insensitive(tmp_html_structure, monkeypatch,
+                                            fake_case_insensitive):
+    """Test a case-insensitive run and that its flag does not leak."""
+    monkeypatch.setattr(html_filename_change, "_case_insensitive", False)
+    monkeypatch.setattr(html_filename_change, "_probe_case_insensitive",
+                        lambda directory: True)
+
+    process_directory(tmp_html_structure)
+    main_html = (tmp_html_structure / "index.html").read_text()
+
+    assert 'Images/Test_Image.jpg' in main_html
+    assert 'SubDir/Page2.html' in main_html
+    assert html_filename_change._case_insensitive is False
+
+
+def test_process_directory_removes_case_maps_file(tmp_html_structure, tmp_path,
+                                                  monkeypatch):
+    """Test that the shared listings file is removed even if writing fails."""
+    monkeypatch.setattr(html_filename_change.tempfile, "tempdir", str(tmp_path))
+    before = set(tmp_path.iterdir())
+
+    def failing_dump(*args, **kwargs):
+        raise pickle.PicklingError("boom")
+
+    monkeypatch.setattr(html_filename_change.pickle, "dump", failing_dump)
+    with pytest.raises(pickle.PicklingError):
+        process_directory(tmp_html_structure)
+
+    assert set(tmp_path.iterdir()) == before